@@ -8,18 +8,24 @@ It utilizes functions defined in other modules to authenticate with the Google P
 and to sync the contacts between the two accounts.
 """
 
+import atexit
 import os
 import configparser
-import json
 import logging
+import queue
 import shutil
 import sys
-from logging.handlers import TimedRotatingFileHandler
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from datetime import date
+from itertools import islice
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+import httpx
+import orjson
 
 # Constants
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -27,19 +33,85 @@ SETTINGS_FILE = os.path.join(ROOT_DIR, "settings.conf")
 DATA_DIR = os.path.join(ROOT_DIR, "data")
 SCOPES = ['https://www.googleapis.com/auth/contacts']
 LOG_DIR = os.path.join(ROOT_DIR, "logs")
-LOG_LEVEL = 'DEBUG'
-LOG_FILE = f"{LOG_DIR}/{date.today():%Y-%m-%d}.log"
+PEOPLE_API_URL = "https://people.googleapis.com"
+MAX_URI_LENGTH = 2048  # Longer GET requests are sent as a POST with the method overridden to GET
+USER_AGENT = 'SGC (gzip)'  # Google only gzips responses for user agents containing "gzip"
+LOG_LEVEL = 'INFO'
+LOG_FILE = os.path.join(LOG_DIR, "sgc.log")  # Rotated at midnight to sgc.log.YYYY-MM-DD by the file handler
+ACCOUNTS = ['Account1', 'Account2']
+# The person fields that were originally requested, minus the profile-only, deprecated and read-only ones
+# (ageRanges, braggingRights, coverPhotos, photos, relationshipInterests, relationshipStatuses, residences,
+# skills, taglines), which are never needed for syncing and only bloat every response. The read-only metadata
+# field is kept because incremental syncs use it to flag deleted contacts.
+PERSON_FIELDS = ','.join((
+    'addresses',
+    'biographies',
+    'birthdays',
+    'emailAddresses',
+    'events',
+    'genders',
+    'imClients',
+    'interests',
+    'locales',
+    'memberships',
+    'metadata',
+    'names',
+    'nicknames',
+    'occupations',
+    'organizations',
+    'phoneNumbers',
+    'relations',
+    'sipAddresses',
+    'urls',
+    'userDefined',
+))
+BATCH_GET_SIZE = 200  # Maximum number of resource names per getBatchGet request
+BATCH_GET_WORKERS = 8  # Concurrent getBatchGet requests per account, kept low to respect quota
 
 # Global Logger
 LOGGER = logging.getLogger()
 
+# Background listener that writes the queued log records to the file and console handlers
+_LOG_LISTENER = None
+
+# Accounts, and the contacts and groups of each account, are synced on separate threads,
+# so updates and writes to the settings file must be serialized
+CONFIG_LOCK = threading.Lock()
+
+# Directories already known to exist, so they are only checked once per run
+_ENSURED_DIRS = set()
+
+# Credentials, keyed by account, so they are only built once and refreshed in place. Each account has
+# its own lock, so a token refresh for one account never holds up the requests of the other.
+_CREDS = {}
+_CREDS_LOCKS = {account: threading.Lock() for account in ACCOUNTS}
+
+
+def ensure_dir(path):
+    """Creates a directory if it does not exist, checking each directory only once per run."""
+    if path in _ENSURED_DIRS:
+        return
+    if not os.path.isdir(path):
+        LOGGER.warning("Specified directory '%s' does not exist so it will be created automatically.", path)
+        os.makedirs(path, exist_ok=True)
+    _ENSURED_DIRS.add(path)
+
+
+def chunks(iterable, size):
+    """Lazily yields lists of at most `size` items from the iterable."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
 
 def setup_logger():
     """Configures the logger with handlers for both console and file output."""
-    LOGGER.info(f"Setting up logger...")
-    if not os.path.isdir(LOG_DIR):
-        LOGGER.warning(f"Specified directory '{LOG_DIR}' does not exist so it will be created automatically.")
-        os.mkdir(LOG_DIR)
+    global _LOG_LISTENER
+    if _LOG_LISTENER is not None:
+        # Already configured; adding the handlers again would duplicate every log record
+        return
+    LOGGER.debug("Setting up logger...")
+    ensure_dir(LOG_DIR)
 
     file_handler = TimedRotatingFileHandler(LOG_FILE, when="midnight", backupCount=30)
     console_handler = logging.StreamHandler()
@@ -52,31 +124,43 @@ def setup_logger():
     file_handler.setFormatter(formatter)
     console_handler.setFormatter(formatter)
 
+    # Logging calls only enqueue the record; the listener thread does the blocking file and console writes
+    log_queue = queue.Queue(-1)
+    _LOG_LISTENER = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _LOG_LISTENER.start()
+    atexit.register(_LOG_LISTENER.stop)  # Flushes any queued records before the process exits
+
     LOGGER.setLevel(LOG_LEVEL)
-    LOGGER.addHandler(file_handler)
-    LOGGER.addHandler(console_handler)
-    LOGGER.info(f"Logger has been successfully setup")
+    LOGGER.addHandler(QueueHandler(log_queue))
+    # httpx logs every request (full URL, including page and sync tokens) at INFO, so only its warnings are kept
+    for http_logger_name in ("httpx", "httpcore"):
+        logging.getLogger(http_logger_name).setLevel(logging.WARNING)
+    LOGGER.debug("Logger has been successfully setup")
 
 
 def on_first_run():
     """Check if settings file exists, and if not, copy the template file."""
+    if os.environ.get("SGC_INITIALIZED"):
+        # Set by wrappers that run the script repeatedly once the settings file is known to be in place
+        return
     TEMPLATE_FILE = os.path.join(ROOT_DIR, "settings.conf.template")
     if not os.path.exists(SETTINGS_FILE):
-        LOGGER.warning(f"Settings file not found. Copying template file {TEMPLATE_FILE} to {SETTINGS_FILE}")
+        LOGGER.warning("Settings file not found. Copying template file %s to %s", TEMPLATE_FILE, SETTINGS_FILE)
         shutil.copy(TEMPLATE_FILE, SETTINGS_FILE)
-        LOGGER.info(f"Copied template settings file to {SETTINGS_FILE}")
-        LOGGER.warning(f"Please place your Google API credentials in the newly created settings file at {SETTINGS_FILE}")
+        LOGGER.info("Copied template settings file to %s", SETTINGS_FILE)
+        LOGGER.warning("Please place your Google API credentials in the newly created settings file at %s", SETTINGS_FILE)
         sys.exit()
     else:
-        LOGGER.info(f"Settings file {SETTINGS_FILE} exists, no need to copy from template.")
+        LOGGER.debug("Settings file %s exists, no need to copy from template.", SETTINGS_FILE)
 
 
 def read_config(config_path):
     """Reads configuration from a file."""
-    LOGGER.info(f"Reading configuration from file: {config_path}")
-    config = configparser.ConfigParser()
+    LOGGER.debug("Reading configuration from file: %s", config_path)
+    # Interpolation is disabled: nothing uses it, and '%' characters in secrets must be read verbatim
+    config = configparser.RawConfigParser()
     config.read(config_path)
-    LOGGER.info(f"Finished reading configuration from file: {config_path}")
+    LOGGER.debug("Finished reading configuration from file: %s", config_path)
     return config
 
 
@@ -84,7 +168,7 @@ def get_refresh_token(client_id, client_secret, account_name):
     """Initiates OAuth 2.0 flow and returns a refresh token."""
     try:
         print(f"Log in with your {account_name} Google account.")
-        LOGGER.info(f"Starting OAuth 2.0 flow for {account_name} Google account...")
+        LOGGER.info("Starting OAuth 2.0 flow for %s Google account...", account_name)
         flow = InstalledAppFlow.from_client_config(
             {"installed":
                 {
@@ -98,45 +182,64 @@ def get_refresh_token(client_id, client_secret, account_name):
             SCOPES
         )
         creds = flow.run_local_server(port=0)
-        LOGGER.info(f"Refresh token successfully generated for {account_name} account.")
+        LOGGER.info("Refresh token successfully generated for %s account.", account_name)
         return creds.refresh_token
     except Exception as e:
-        LOGGER.error(f"Error occurred while generating refresh token for {account_name} account: {e}")
+        LOGGER.error("Error occurred while generating refresh token for %s account: %s", account_name, e)
 
 
 def write_credentials(filename, config):
     """Writes the credentials to a file."""
+    # Write to a temporary file and swap it in, so an interrupted write never truncates the settings
+    tmp_filename = f"{filename}.tmp"
     try:
-        LOGGER.info(f"Writing credentials to file: {filename}")
-        with open(filename, 'w') as f:
-            config.write(f)
-        LOGGER.info('New refresh tokens successfully written to settings.conf')
+        LOGGER.debug("Writing credentials to file: %s", filename)
+        with CONFIG_LOCK:
+            # The file holds client secrets and refresh tokens, so it is never created readable by others,
+            # and an existing settings file keeps its permissions
+            with open(os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+                config.write(f)
+            if os.path.exists(filename):
+                shutil.copymode(filename, tmp_filename)
+            os.replace(tmp_filename, filename)
+        LOGGER.debug('New refresh tokens successfully written to settings.conf')
     except Exception as e:
-        LOGGER.error(f"Error occurred while writing credentials to file: {filename}, error: {e}")
+        LOGGER.error("Error occurred while writing credentials to file: %s, error: %s", filename, e)
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+
+
+def save_sync_token(account, config, option, sync_token):
+    """Stores a new sync token for a particular account and writes it to the settings file."""
+    # Contacts and groups of the same account are synced on separate threads, so the update is locked as well
+    with CONFIG_LOCK:
+        config[account][option] = sync_token or ''
+    LOGGER.debug("Obtained %s: %s, saving to config.", option, sync_token)
+    write_credentials(SETTINGS_FILE, config)
 
 
 def refresh_token_exists(account, config):
     """Check if refresh token is present for a particular account in settings.conf"""
-    LOGGER.info(f"Checking if refresh token exists for {account}")
+    LOGGER.debug("Checking if refresh token exists for %s", account)
     refresh_token = config.get(account, 'refresh_token', fallback="")
     exists = refresh_token != ""
     if exists:
-        LOGGER.info(f"Refresh token for {account} exists.")
+        LOGGER.debug("Refresh token for %s exists.", account)
     else:
-        LOGGER.warning(f"Refresh token for {account} does not exist.")
+        LOGGER.warning("Refresh token for %s does not exist.", account)
     return exists
 
 
 def ensure_refresh_token(account, config):
     """Ensure a refresh token exists for a particular account, generating one if necessary."""
-    LOGGER.info(f"Ensuring refresh token for {account}")
+    LOGGER.debug("Ensuring refresh token for %s", account)
     if not refresh_token_exists(account, config):
         generate_and_save_refresh_token(account, config)
 
 
 def generate_and_save_refresh_token(account, config):
     """Generate a new refresh token and save it to the settings file."""
-    LOGGER.info(f"Generating new refresh token for {account}...")
+    LOGGER.info("Generating new refresh token for %s...", account)
     client_id = config.get(account, 'client_id')
     client_secret = config.get(account, 'client_secret')
     refresh_token = get_refresh_token(client_id, client_secret, account)
@@ -145,119 +248,243 @@ def generate_and_save_refresh_token(account, config):
 
 
 def get_credentials(account, config):
-    """Get valid credentials for the account."""
-    creds = None
-    client_id = config.get(account, 'client_id')
-    client_secret = config.get(account, 'client_secret')
-    refresh_token = config.get(account, 'refresh_token')
-
-    creds = Credentials.from_authorized_user_info(
-        {"client_id": client_id, "client_secret": client_secret, "refresh_token": refresh_token},
-        SCOPES
-    )
-
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            LOGGER.info(f"Refreshing expired credentials for {account}...")
-            creds.refresh(Request())
-        else:
-            LOGGER.error(f"Unable to get valid credentials for {account}. Please check your settings.")
-            sys.exit(1)
+    """Get valid credentials for the account, reusing the account's cached credentials if possible."""
+    with _CREDS_LOCKS[account]:
+        creds = _CREDS.get(account)
+        if creds is None:
+            client_id = config.get(account, 'client_id')
+            client_secret = config.get(account, 'client_secret')
+            refresh_token = config.get(account, 'refresh_token')
+
+            creds = Credentials.from_authorized_user_info(
+                {"client_id": client_id, "client_secret": client_secret, "refresh_token": refresh_token},
+                SCOPES
+            )
+            _CREDS[account] = creds
+
+        # Credentials built from a refresh token have no access token (or expiry) yet, so they are
+        # refreshed whenever they are not valid rather than only once they have expired
+        if not creds.valid:
+            if creds.refresh_token:
+                LOGGER.info("Refreshing expired credentials for %s...", account)
+                creds.refresh(Request())
+            else:
+                LOGGER.error("Unable to get valid credentials for %s. Please check your settings.", account)
+                sys.exit(1)
     return creds
 
 
-def get_people_service(creds):
-    """Get a service that communicates to a Google API."""
-    return build('people', 'v1', credentials=creds)
+class GoogleAuth(httpx.Auth):
+    """Authorizes requests with the access token of the credentials, refreshing it when needed."""
 
+    def __init__(self, creds, lock):
+        self._creds = creds
+        self._lock = lock
 
-def get_all_contacts(account, config):
-    """Gets all contact data for a particular account."""
+    def auth_flow(self, request):
+        with self._lock:
+            if not self._creds.valid:
+                self._creds.refresh(Request())
+            self._creds.apply(request.headers)
+            token = self._creds.token
+        response = yield request
 
-    creds = get_credentials(account, config)
-    people_service = get_people_service(creds)
+        if response.status_code == 401:
+            # The token was revoked or reissued before its expiry, so it is refreshed and the request retried once
+            with self._lock:
+                # Another thread may already have refreshed the token after a 401 of its own
+                if self._creds.token == token:
+                    self._creds.refresh(Request())
+                self._creds.apply(request.headers)
+            yield request
+
+
+class PeopleClient:
+    """Thin client for the People API endpoints used by the sync."""
+
+    def __init__(self, account, creds):
+        # The client is shared by all threads of an account: their requests are multiplexed as
+        # streams over a single HTTP/2 connection instead of each opening its own connection
+        auth = GoogleAuth(creds, _CREDS_LOCKS[account])
+        self._client = httpx.Client(base_url=PEOPLE_API_URL, http2=True, auth=auth,
+                                    headers={'User-Agent': USER_AGENT}, timeout=60)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._client.close()
+
+    def _get(self, path, params):
+        # Unset parameters are left out entirely, since the API rejects empty page and sync tokens
+        request = self._client.build_request('GET', path, params={k: v for k, v in params.items() if v is not None})
+        if len(str(request.url)) > MAX_URI_LENGTH:
+            # A getBatchGet for 200 resource names makes a URL far too long for Google's servers, so the
+            # query is moved into a form-encoded POST body that the API still handles as a GET
+            request = self._client.build_request(
+                'POST', path, content=request.url.query,
+                headers={'X-HTTP-Method-Override': 'GET', 'Content-Type': 'application/x-www-form-urlencoded'})
+        response = self._client.send(request)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    def list_connections(self, **params):
+        return self._get("/v1/people/me/connections", params)
+
+    def batch_get(self, **params):
+        return self._get("/v1/people:batchGet", params)
+
+    def list_contact_groups(self, **params):
+        return self._get("/v1/contactGroups", params)
+
+
+def batch_get_people(people_client, resource_names):
+    """Gets the full person data for a chunk of (at most 200) resource names."""
+    batch_get_results = people_client.batch_get(resourceNames=resource_names, personFields=PERSON_FIELDS)
+    return [person['person'] for person in batch_get_results.get('responses', []) if 'person' in person]
+
+
+def get_all_contacts(account, config, people_client, sync_state):
+    """Yields all contact data for a particular account, storing the new sync token in sync_state once done."""
 
-    resource_names = []
     page_token = None
     sync_token = config[account]['contactsSyncToken'] or None
-    personFields = 'addresses,ageRanges,biographies,birthdays,braggingRights,coverPhotos,emailAddresses,events,genders,imClients,interests,locales,memberships,metadata,names,nicknames,occupations,organizations,phoneNumbers,photos,relations,relationshipInterests,relationshipStatuses,residences,sipAddresses,skills,taglines,urls,userDefined'
-
-    while True:
-        results = people_service.people().connections().list(
-            resourceName='people/me',
-            pageSize=2000,
-            pageToken=page_token,
-            personFields=personFields,
-            requestSyncToken=True,
-            sortOrder='LAST_MODIFIED_DESCENDING',
-            sources=['READ_SOURCE_TYPE_CONTACT'],
-            syncToken=sync_token,
-            prettyPrint=True).execute()
-
-        save_to_file('raw_contacts', account, results)  # Save raw JSON response
-        config[account]['contactsSyncToken'] = results.get('nextSyncToken')
-        LOGGER.info(f"Obtained nextSyncToken: {config[account]['contactsSyncToken']}, saving to config.")
-        write_credentials(SETTINGS_FILE, config)
-
-        connections = results.get('connections', [])
-        resource_names.extend([c['resourceName'] for c in connections])
-
-        page_token = results.get('nextPageToken')
-        if not page_token:
-            break
-
-    contacts = []
-    chunked_resource_names = [resource_names[i:i + 200] for i in range(0, len(resource_names), 200)]
-
-    for chunk in chunked_resource_names:
-        batch_get_results = people_service.people().getBatchGet(
-            resourceNames=chunk,
-            personFields=personFields
-        ).execute()
-        contacts.extend([person['person'] for person in batch_get_results.get('responses', []) if 'person' in person])
-
-    return contacts
-
-
-def get_group_list(account, config):
-    """Gets all contact group data for a particular account."""
-    creds = get_credentials(account, config)
-    people_service = get_people_service(creds)
-
+    next_sync_token = None
+    # An incremental sync already returns the full person data for every changed contact,
+    # so batchGet is only needed to fetch everything on the initial (full) sync.
+    was_initial = sync_token is None
+
+    # Each page's resource names are handed to the batchGet workers as soon as the page arrives,
+    # so the batchGet round-trips overlap with fetching the remaining pages.
+    batch_futures = deque()
+    resource_names = {}  # Ordered set of every resource name already handed to the batchGet workers
+    with ThreadPoolExecutor(max_workers=BATCH_GET_WORKERS) as executor:
+        while True:
+            results = people_client.list_connections(
+                pageSize=2000,
+                pageToken=page_token,
+                personFields=PERSON_FIELDS,
+                requestSyncToken=True,
+                sortOrder='LAST_MODIFIED_DESCENDING',
+                sources=['READ_SOURCE_TYPE_CONTACT'],
+                syncToken=sync_token)
+
+            save_to_file('raw_contacts', account, results)  # Save raw JSON response
+            # Only the last page carries the nextSyncToken, so it is handed back once pagination finishes
+            next_sync_token = results.get('nextSyncToken')
+
+            connections = results.get('connections', [])
+            if was_initial:
+                # Pages can overlap when contacts are edited mid-sync, so each contact is only fetched once
+                page_resource_names = dict.fromkeys(
+                    c['resourceName'] for c in connections if c['resourceName'] not in resource_names)
+                resource_names.update(page_resource_names)
+                for chunk in chunks(page_resource_names, BATCH_GET_SIZE):
+                    batch_futures.append(executor.submit(batch_get_people, people_client, chunk))
+                # Hand over finished batches straight away, in order, so their people don't pile up in memory
+                while batch_futures and batch_futures[0].done():
+                    yield from batch_futures.popleft().result()
+            else:
+                yield from connections
+
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                break
+
+        while batch_futures:
+            yield from batch_futures.popleft().result()
+
+    sync_state['nextSyncToken'] = next_sync_token
+
+
+def get_group_list(account, config, people_client, sync_state):
+    """Gets all contact group data for a particular account, storing the new sync token in sync_state."""
     page_token = None
     sync_token = config[account]['groupSyncToken'] or None
     groupFields = 'clientData,groupType,memberCount,metadata,name'
 
     # Get all contact groups
-    results = people_service.contactGroups().list(
+    results = people_client.list_contact_groups(
         pageSize=1000,
         pageToken=page_token,
         groupFields=groupFields,
-        syncToken=sync_token,
-        prettyPrint=True).execute()
+        syncToken=sync_token)
 
     save_to_file('raw_groups', account, results)  # Save raw JSON response
-    config[account]['groupSyncToken'] = results.get('nextSyncToken')
-    LOGGER.info(f"Obtained nextSyncToken: {config[account]['groupSyncToken']}, saving to config.")
-    write_credentials(SETTINGS_FILE, config)
+    sync_state['nextSyncToken'] = results.get('nextSyncToken')
 
     groups = results.get('contactGroups', [])
 
     return groups
 
 
+def get_data_file_path(data_type, account):
+    """Get the path of today's JSON file for the data type and account."""
+
+    ensure_dir(DATA_DIR)
+
+    file_name_base = f"{date.today():%Y-%m-%d}.{account}_{data_type}"
+    return os.path.join(DATA_DIR, f"{file_name_base}.json")
+
+
 def save_to_file(data_type, account, data):
     """Save the data to a JSON file."""
+    with open(get_data_file_path(data_type, account), 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
 
-    if not os.path.isdir(DATA_DIR):
-        LOGGER.warning(f"Specified directory '{DATA_DIR}' does not exist so it will be created automatically.")
-        os.mkdir(DATA_DIR)
 
-    file_name_base = f"{date.today():%Y-%m-%d}.{account}_{data_type}"
-    json_file_path = os.path.join(DATA_DIR, f"{file_name_base}.json")
+def save_iter_to_file(data_type, account, items):
+    """Save the items to a JSON array file as they are produced, one item per line."""
+    json_file_path = get_data_file_path(data_type, account)
+    # Write to a temporary file and swap it in once every item was written, so an error while
+    # producing the items never truncates an earlier file
+    tmp_file_path = f"{json_file_path}.tmp"
+    try:
+        with open(tmp_file_path, 'wb') as f:
+            f.write(b'[')
+            for index, item in enumerate(items):
+                f.write(b',\n' if index else b'\n')
+                f.write(orjson.dumps(item))
+            f.write(b'\n]\n')
+    except BaseException:
+        os.unlink(tmp_file_path)
+        raise
+    os.replace(tmp_file_path, json_file_path)
+
+
+def sync_contacts(account, config, people_client):
+    """Fetches and saves the contacts for a particular account, then saves the new sync token."""
+    sync_state = {}
+    # Contacts are written out as they arrive rather than collected into one large list first
+    save_iter_to_file('contacts', account, get_all_contacts(account, config, people_client, sync_state))
+    # The sync token only moves forward once the contacts file has been completely written
+    save_sync_token(account, config, 'contactsSyncToken', sync_state.get('nextSyncToken'))
+
+
+def sync_groups(account, config, people_client):
+    """Fetches and saves the contact groups for a particular account, then saves the new sync token."""
+    sync_state = {}
+    save_to_file('groups', account, get_group_list(account, config, people_client, sync_state))
+    # The sync token only moves forward once the groups file has been written
+    save_sync_token(account, config, 'groupSyncToken', sync_state.get('nextSyncToken'))
+
+
+def sync_account(account, config):
+    """Fetches and saves the contacts and contact groups for a particular account."""
+    creds = get_credentials(account, config)
 
-    with open(json_file_path, 'w') as f:
-        json.dump(data, f)
+    # Contacts and groups come from independent endpoints, so they are fetched concurrently
+    with PeopleClient(account, creds) as people_client, ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(sync_contacts, account, config, people_client),
+            executor.submit(sync_groups, account, config, people_client),
+        ]
+        # Consuming the results re-raises any exception from the task threads
+        for future in futures:
+            future.result()
 
 
 def main():
@@ -267,16 +494,14 @@ def main():
     on_first_run()
 
     config = read_config(SETTINGS_FILE)
-    ensure_refresh_token('Account1', config)
-    ensure_refresh_token('Account2', config)
-
-    # Fetch and save contacts
-    for account in ['Account1', 'Account2']:
-        contacts = get_all_contacts(account, config)
-        save_to_file('contacts', account, contacts)
-
-        groups = get_group_list(account, config)
-        save_to_file('groups', account, groups)
+    # The OAuth flow is interactive, so tokens are ensured one account at a time
+    for account in ACCOUNTS:
+        ensure_refresh_token(account, config)
+
+    # Fetch and save contacts for all accounts concurrently
+    with ThreadPoolExecutor(max_workers=len(ACCOUNTS)) as executor:
+        # Consuming the results re-raises any exception from the account threads
+        list(executor.map(lambda account: sync_account(account, config), ACCOUNTS))
 
     LOGGER.info("Main execution finished successfully")
 